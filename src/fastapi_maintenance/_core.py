@@ -25,6 +25,16 @@ def register_middleware_backend(backend: Optional[BaseStateBackend]) -> None:
     _middleware_backend = backend
 
 
+def reset_backend() -> None:
+    """Reset the configured default backend and the registered middleware backend.
+
+    After resetting, the default environment variable backend is created again on next use.
+    """
+    global _backend, _middleware_backend
+    _backend = None
+    _middleware_backend = None
+
+
 def _get_default_backend() -> BaseStateBackend:
     """Get or create the default backend instance.
 
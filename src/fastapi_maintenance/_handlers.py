@@ -4,6 +4,21 @@ Built-in handlers for FastAPI maintenance mode.
 
 from starlette.requests import Request
 
+_DOCS_ENDPOINTS = frozenset({"/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"})
+"""Paths of FastAPI's built-in documentation endpoints."""
+
+
+def is_docs_endpoint(path: str) -> bool:
+    """Check if a path is one of FastAPI's built-in documentation endpoints.
+
+    Args:
+        path: The URL path to check.
+
+    Returns:
+        True if the path is a documentation endpoint, False otherwise.
+    """
+    return path in _DOCS_ENDPOINTS
+
 
 def exempt_docs_endpoints(request: Request) -> bool:
     """Exempt FastAPI's built-in documentation endpoints from maintenance mode.
@@ -20,9 +35,4 @@ def exempt_docs_endpoints(request: Request) -> bool:
     Returns:
         True if the request should be exempt from maintenance mode, False otherwise.
     """
-    path = request.url.path
-
-    # FastAPI built-in documentation endpoints
-    docs_endpoints = ["/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"]
-
-    return path in docs_endpoints
+    return is_docs_endpoint(request.url.path)
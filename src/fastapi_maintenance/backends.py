@@ -5,9 +5,10 @@ State storage backends for maintenance mode.
 import logging
 import os
 from abc import ABC, abstractmethod
+from time import monotonic, time_ns
 from typing import Any, Optional
 
-from anyio import Path, open_file
+from anyio import Lock, Path, open_file
 
 from ._constants import MAINTENANCE_MODE_ENV_VAR_NAME
 
@@ -15,12 +16,20 @@ logger = logging.getLogger(__name__)
 
 __all__ = ["BaseStateBackend", "EnvVarBackend", "LocalFileBackend"]
 
+_TRUTHY_VALUES = frozenset({"1", "on", "t", "true", "y", "yes"})
+"""Normalized string values that represent an enabled maintenance mode state."""
+
+_FALSY_VALUES = frozenset({"", "0", "off", "f", "false", "n", "no"})
+"""Normalized string values that represent a disabled maintenance mode state."""
+
 
 class BaseStateBackend(ABC):
     """
     Abstract base class for maintenance mode state backends.
     """
 
+    __slots__ = ()
+
     @staticmethod
     def _bool_to_str(value: bool) -> str:
         """
@@ -40,12 +49,16 @@ class BaseStateBackend(ABC):
         - Falsy values (case-insensitive): '0', 'no', 'n', 'false', 'f', 'off'
         - Empty or missing values: False
         """
-        value = value.strip().lower()
-        if not value:
+        # Fast path for values that are already normalized
+        if value in _TRUTHY_VALUES:
+            return True
+        if value in _FALSY_VALUES:
             return False
-        if value in {1, "1", "on", "t", "true", "y", "yes"}:
+
+        value = value.strip().lower()
+        if value in _TRUTHY_VALUES:
             return True
-        elif value in {0, "0", "off", "f", "false", "n", "no"}:
+        elif value in _FALSY_VALUES:
             return False
         else:
             raise ValueError("state value is not correct")
@@ -75,8 +88,25 @@ class EnvVarBackend(BaseStateBackend):
         var_name: Name of the environment variable to use. Defaults to None to use `FASTAPI_MAINTENANCE_MODE`.
     """
 
+    __slots__ = (
+        "var_name",
+        "_cached_raw_value",
+        "_cached_value",
+        "_cached_value_is_valid",
+        "_last_warned_value",
+        "_last_warned_at",
+    )
+
+    _INVALID_VALUE_WARNING_INTERVAL = 60.0
+    """Minimum number of seconds between repeated warnings about the same invalid value."""
+
     def __init__(self, var_name: Optional[str] = None) -> None:
         self.var_name = var_name
+        self._cached_raw_value: Optional[str] = None
+        self._cached_value: bool = False
+        self._cached_value_is_valid: bool = True
+        self._last_warned_value: Optional[str] = None
+        self._last_warned_at: float = 0.0
 
     @property
     def _var_name(self) -> str:
@@ -90,15 +120,24 @@ class EnvVarBackend(BaseStateBackend):
         """
         value = os.environ.get(self._var_name, "")
 
-        try:
-            return self._str_to_bool(value)
-        except ValueError:
-            pass
-
-        logger.warning(
-            f"Invalid value '{value}' for environment variable {self._var_name}. "
-            f"Expected boolean-like value. Defaulting to False."
-        )
+        # Only parse the value again when the environment variable has changed
+        if value != self._cached_raw_value:
+            self._cached_raw_value = value
+            try:
+                self._cached_value, self._cached_value_is_valid = self._str_to_bool(value), True
+            except ValueError:
+                self._cached_value, self._cached_value_is_valid = False, False
+        if self._cached_value_is_valid:
+            return self._cached_value
+
+        # Rate-limit the warning, since an invalid value would otherwise be logged on every request
+        now = monotonic()
+        if value != self._last_warned_value or now - self._last_warned_at >= self._INVALID_VALUE_WARNING_INTERVAL:
+            self._last_warned_value, self._last_warned_at = value, now
+            logger.warning(
+                f"Invalid value '{value}' for environment variable {self._var_name}. "
+                f"Expected boolean-like value. Defaulting to False."
+            )
         return False
 
     async def set_value(self, value: bool) -> None:
@@ -124,31 +163,78 @@ class LocalFileBackend(BaseStateBackend):
         file_path: Path to the file that stores the maintenance mode state.
     """
 
+    __slots__ = (
+        "file_path",
+        "_cached_file_status",
+        "_cached_value",
+        "_write_lock",
+        "_requested_value",
+        "_last_requested_write",
+        "_last_completed_write",
+    )
+
+    _RACY_MTIME_WINDOW_NS = 1_000_000_000
+    """Files modified more recently than this many nanoseconds ago are always read, since another write
+    within the resolution of the file system timestamps would leave the file's status unchanged."""
+
     def __init__(self, file_path: str) -> None:
         self.file_path = file_path
+        self._cached_file_status: Optional[tuple[int, int, int]] = None
+        self._cached_value: bool = False
+        self._write_lock = Lock()
+        self._requested_value: bool = False
+        self._last_requested_write: int = 0
+        self._last_completed_write: int = 0
 
     async def get_value(self) -> bool:
         """Get maintenance mode state from file.
 
+        The file is only read when its status (inode, size and modification time) has changed since the last read.
+
         Returns:
             A boolean indicating the current maintenance mode state.
         """
-        if not await Path(self.file_path).exists():
+        try:
+            file_stat = await Path(self.file_path).stat()
+        except FileNotFoundError:
             await self.set_value(False)
             return False
 
+        file_status = (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+        if file_status == self._cached_file_status:
+            return self._cached_value
+
         async with await open_file(self.file_path, "r") as f:
             content = await f.read()
-            return self._str_to_bool(content)
+        value = self._str_to_bool(content)
+
+        if time_ns() - file_stat.st_mtime_ns > self._RACY_MTIME_WINDOW_NS:
+            self._cached_file_status, self._cached_value = file_status, value
+        return value
 
     async def set_value(self, value: bool) -> None:
         """Set maintenance mode state in file.
 
+        Concurrent calls are coalesced so that only the latest value is written. Each call returns once
+        its value, or a value set after it, has been written to the file.
+
         Args:
             value: A boolean indicating the maintenance mode state to set.
         """
-        async with await open_file(self.file_path, "w") as f:
-            await f.write(self._bool_to_str(value))
+        self._last_requested_write += 1
+        write_id = self._last_requested_write
+        self._requested_value = value
+
+        async with self._write_lock:
+            # A value set after this call has already been written
+            if self._last_completed_write >= write_id:
+                return
+
+            write_id, value = self._last_requested_write, self._requested_value
+            self._cached_file_status = None
+            async with await open_file(self.file_path, "w") as f:
+                await f.write(self._bool_to_str(value))
+            self._last_completed_write = write_id
 
 
 def _get_backend(backend_type: str, **kwargs: Any) -> BaseStateBackend:
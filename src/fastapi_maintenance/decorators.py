@@ -5,6 +5,7 @@ Decorators for FastAPI routes to force maintenance mode behavior.
 from __future__ import annotations
 
 import asyncio
+import weakref
 from functools import wraps
 from typing import Any, Callable
 
@@ -14,6 +15,12 @@ RouteHandler = Callable[..., Any]
 
 __all__ = ["force_maintenance_mode_off", "force_maintenance_mode_on"]
 
+_FORCED_ON_ENDPOINTS: weakref.WeakSet[RouteHandler] = weakref.WeakSet()
+"""Route handlers decorated with `force_maintenance_mode_on`, looked up by the middleware."""
+
+_FORCED_OFF_ENDPOINTS: weakref.WeakSet[RouteHandler] = weakref.WeakSet()
+"""Route handlers decorated with `force_maintenance_mode_off`, looked up by the middleware."""
+
 
 def force_maintenance_mode_off(func: RouteHandler) -> RouteHandler:
     """Decorator to force maintenance mode off for a specific route.
@@ -34,9 +41,10 @@ def force_maintenance_mode_off(func: RouteHandler) -> RouteHandler:
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
             return await func(*args, **kwargs)
 
-        # Add attribute to function for middleware to check
+        # Mark the function and register it for the middleware to look up
         async_wrapper.__dict__[FORCE_MAINTENANCE_MODE_OFF_ATTR] = True
         async_wrapper.__dict__[FORCE_MAINTENANCE_MODE_ON_ATTR] = False
+        _FORCED_OFF_ENDPOINTS.add(async_wrapper)
         return async_wrapper
     else:
 
@@ -44,9 +52,10 @@ def force_maintenance_mode_off(func: RouteHandler) -> RouteHandler:
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
             return func(*args, **kwargs)
 
-        # Add attribute to function for middleware to check
+        # Mark the function and register it for the middleware to look up
         sync_wrapper.__dict__[FORCE_MAINTENANCE_MODE_OFF_ATTR] = True
         sync_wrapper.__dict__[FORCE_MAINTENANCE_MODE_ON_ATTR] = False
+        _FORCED_OFF_ENDPOINTS.add(sync_wrapper)
         return sync_wrapper
 
 
@@ -69,9 +78,10 @@ def force_maintenance_mode_on(func: RouteHandler) -> RouteHandler:
         async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
             return await func(*args, **kwargs)
 
-        # Add attribute to function for middleware to check
+        # Mark the function and register it for the middleware to look up
         async_wrapper.__dict__[FORCE_MAINTENANCE_MODE_ON_ATTR] = True
         async_wrapper.__dict__[FORCE_MAINTENANCE_MODE_OFF_ATTR] = False
+        _FORCED_ON_ENDPOINTS.add(async_wrapper)
         return async_wrapper
     else:
 
@@ -79,7 +89,8 @@ def force_maintenance_mode_on(func: RouteHandler) -> RouteHandler:
         def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
             return func(*args, **kwargs)
 
-        # Add attribute to function for middleware to check
+        # Mark the function and register it for the middleware to look up
         sync_wrapper.__dict__[FORCE_MAINTENANCE_MODE_ON_ATTR] = True
         sync_wrapper.__dict__[FORCE_MAINTENANCE_MODE_OFF_ATTR] = False
+        _FORCED_ON_ENDPOINTS.add(sync_wrapper)
         return sync_wrapper
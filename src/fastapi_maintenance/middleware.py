@@ -5,35 +5,35 @@ Middleware for FastAPI maintenance mode.
 from __future__ import annotations
 
 import asyncio
+import inspect
 import re
 import sys
-from functools import lru_cache
+from collections import deque
+from functools import lru_cache, wraps
 from re import Pattern
-from typing import Awaitable, Callable, Literal, Optional, TypeVar, Union, cast
+from time import monotonic
+from typing import Any, Awaitable, Callable, Literal, Optional, TypeVar, Union, cast
 
 if sys.version_info >= (3, 10):
     from typing import ParamSpec
 else:
     from typing_extensions import ParamSpec
 
+from anyio import Event
 from fastapi import status
 from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response
 from starlette.routing import Match
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from ._constants import (
-    DEFAULT_JSON_RESPONSE_CONTENT,
-    FORCE_MAINTENANCE_MODE_OFF_ATTR,
-    FORCE_MAINTENANCE_MODE_ON_ATTR,
-)
+from ._constants import DEFAULT_JSON_RESPONSE_CONTENT
 from ._context import is_maintenance_override_ctx_active
 from ._core import get_maintenance_mode, register_middleware_backend
-from ._handlers import exempt_docs_endpoints
+from ._handlers import is_docs_endpoint
 from .backends import BaseStateBackend
+from .decorators import _FORCED_OFF_ENDPOINTS, _FORCED_ON_ENDPOINTS
 
 P = ParamSpec("P")
 R = TypeVar("R")
@@ -42,8 +42,70 @@ HandlerFunction = Union[Callable[P, R], Callable[P, Awaitable[R]]]
 
 __all__ = ["MaintenanceModeMiddleware"]
 
+_NAMED_GROUP_RE = re.compile(r"\(\?P<\w+>")
 
-class MaintenanceModeMiddleware(BaseHTTPMiddleware):
+
+def _as_async(handler: HandlerFunction[P, R]) -> Callable[P, Awaitable[R]]:
+    """Wrap a sync or async handler function so that it can always be awaited.
+
+    Args:
+        handler: The sync or async handler function.
+
+    Returns:
+        The handler function itself if it's async, otherwise an async function calling it.
+    """
+    if asyncio.iscoroutinefunction(handler):
+        return cast(Callable[P, Awaitable[R]], handler)
+
+    sync_handler = cast(Callable[P, R], handler)
+
+    @wraps(sync_handler)
+    async def async_handler(*args: P.args, **kwargs: P.kwargs) -> R:
+        return sync_handler(*args, **kwargs)
+
+    return async_handler
+
+
+class _SharedStateRead:
+    """A backend state read shared by concurrent requests.
+
+    The state and error are both left unset if the read was cancelled.
+    """
+
+    __slots__ = ("done", "state", "error")
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.state: Optional[bool] = None
+        self.error: Optional[Exception] = None
+
+
+class _RequestBodyReplay:
+    """Records the request body messages read by the exempt handler, so that they can be replayed.
+
+    The exempt handler reads the request through `receive`, and the request is then forwarded with
+    `replay`, which returns the recorded messages before receiving from the server again.
+    """
+
+    __slots__ = ("_receive", "_messages")
+
+    def __init__(self, receive: Receive) -> None:
+        self._receive = receive
+        self._messages: deque[Message] = deque()
+
+    async def receive(self) -> Message:
+        message = await self._receive()
+        if message["type"] == "http.request":
+            self._messages.append(message)
+        return message
+
+    async def replay(self) -> Message:
+        if self._messages:
+            return self._messages.popleft()
+        return await self._receive()
+
+
+class MaintenanceModeMiddleware:
     """Middleware for enabling maintenance mode in FastAPI applications.
 
     Args:
@@ -52,8 +114,35 @@ class MaintenanceModeMiddleware(BaseHTTPMiddleware):
         backend: Optional backend for maintenance mode state storage. Defaults to None for environment variable backend or another backend set by `configure_backend`.
         exempt_handler: Handler function (sync or async) that determines if a request should be exempt from maintenance mode. Defaults to None for no exemption.
         response_handler: Handler function (sync or async) to return a custom response during maintenance mode. Defaults to None for the default JSON response.
+        cache_ttl: Number of seconds to cache the backend's state value for, so that at most one backend read is performed per interval. Defaults to None to read the backend's state value on every request.
     """
 
+    __slots__ = (
+        "app",
+        "enable_maintenance",
+        "backend",
+        "exempt_handler",
+        "response_handler",
+        "cache_ttl",
+        "_exempt_handler",
+        "_response_handler",
+        "_app_routes",
+        "_forced_on_static_paths",
+        "_forced_off_static_paths",
+        "_forced_on_paths",
+        "_forced_off_paths",
+        "_cached_path_matches_patterns",
+        "_cached_route_exists",
+        "_cached_state",
+        "_cached_state_expires_at",
+        "_pending_state_read",
+        "_default_response_body",
+        "_default_response_headers",
+        "_is_maintenance_active",
+        "_is_exempt",
+        "_send_maintenance_response",
+    )
+
     _FORCED_PATH_MATCH_CACHE_SIZE = 128
     _ROUTE_EXISTS_CACHE_SIZE = 128
 
@@ -64,75 +153,196 @@ class MaintenanceModeMiddleware(BaseHTTPMiddleware):
         backend: Optional[BaseStateBackend] = None,
         exempt_handler: Optional[HandlerFunction[[Request], bool]] = None,
         response_handler: Optional[HandlerFunction[[Request], Response]] = None,
+        cache_ttl: Optional[float] = None,
     ) -> None:
-        super().__init__(app)
+        self.app = app
         self.enable_maintenance = enable_maintenance
         self.backend = backend
         self.exempt_handler = exempt_handler
         self.response_handler = response_handler
+        self.cache_ttl = cache_ttl
+        self._exempt_handler = _as_async(exempt_handler) if exempt_handler is not None else None
+        self._response_handler = _as_async(response_handler) if response_handler is not None else None
 
         register_middleware_backend(self.backend)
         self._app_routes: list[APIRoute] = []
-        self._forced_on_paths: tuple[Pattern[str], ...] = ()
-        self._forced_off_paths: tuple[Pattern[str], ...] = ()
-        self._forced_paths_collected: bool = False
+        self._forced_on_static_paths: frozenset[str] = frozenset()
+        self._forced_off_static_paths: frozenset[str] = frozenset()
+        self._forced_on_paths: Optional[Pattern[str]] = None
+        self._forced_off_paths: Optional[Pattern[str]] = None
         self._cached_path_matches_patterns = lru_cache(maxsize=self._FORCED_PATH_MATCH_CACHE_SIZE)(
             self._path_matches_patterns
         )
         self._cached_route_exists = lru_cache(maxsize=self._ROUTE_EXISTS_CACHE_SIZE)(self._route_exists)
+        self._cached_state: bool = False
+        self._cached_state_expires_at: float = 0.0
+        self._pending_state_read: Optional[_SharedStateRead] = None
+
+        # Prebuild the default maintenance response once instead of rendering it for every request
+        default_response = JSONResponse(
+            content=DEFAULT_JSON_RESPONSE_CONTENT,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "3600"},
+        )
+        self._default_response_body = default_response.body
+        self._default_response_headers = tuple(default_response.raw_headers)
+
+        # Select the implementations for this configuration once, so that requests don't re-check it
+        self._is_maintenance_active: Callable[[], Awaitable[bool]]
+        if enable_maintenance is not None:
+            self._is_maintenance_active = self._get_static_state
+        elif cache_ttl:
+            self._is_maintenance_active = self._get_cached_backend_state
+        else:
+            self._is_maintenance_active = self._read_backend_state
+        self._is_exempt: Callable[[Scope, Receive], Awaitable[bool]] = (
+            self._is_exempt_by_docs_or_handler if exempt_handler is not None else self._is_exempt_by_docs
+        )
+        self._send_maintenance_response: Callable[[Scope, Receive, Send], Awaitable[None]] = (
+            self._send_custom_maintenance_response
+            if response_handler is not None
+            else self._send_default_maintenance_response
+        )
 
     def _collect_forced_maintenance_paths(self, routes: list[APIRoute]) -> None:
         # Clear instance-specific caches before recollection
         self._cached_path_matches_patterns.cache_clear()
         self._cached_route_exists.cache_clear()
 
-        forced_on_paths, forced_off_paths = [], []
+        forced_on_routes, forced_off_routes = [], []
         for route in routes:
-            if getattr(route.endpoint, "__dict__", {}).get(FORCE_MAINTENANCE_MODE_ON_ATTR, False):
-                forced_on_paths.append(route.path_regex)
-                continue
-            if getattr(route.endpoint, "__dict__", {}).get(FORCE_MAINTENANCE_MODE_OFF_ATTR, False):
-                forced_off_paths.append(route.path_regex)
-        self._forced_on_paths = tuple(forced_on_paths)
-        self._forced_off_paths = tuple(forced_off_paths)
-
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        if not self._forced_paths_collected or self._app_routes != request.app.routes:
-            self._app_routes = request.app.routes.copy()
-            self._collect_forced_maintenance_paths(self._app_routes)
-            self._forced_paths_collected = True
+            forced_mode = self._get_forced_maintenance_mode(route.endpoint)
+            if forced_mode == "on":
+                forced_on_routes.append(route)
+            elif forced_mode == "off":
+                forced_off_routes.append(route)
+        forced_on_matchers = self._build_path_matchers(forced_on_routes)
+        forced_off_matchers = self._build_path_matchers(forced_off_routes)
+        self._forced_on_static_paths, self._forced_on_paths = forced_on_matchers
+        self._forced_off_static_paths, self._forced_off_paths = forced_off_matchers
+
+    @staticmethod
+    def _get_forced_maintenance_mode(endpoint: Callable[..., Any]) -> Optional[Literal["on", "off"]]:
+        """Get the maintenance mode forced for an endpoint by the route decorators.
+
+        The `__wrapped__` chain of the endpoint is followed, so that the route decorators are also
+        detected when applied under other decorators. The outermost route decorator takes precedence.
+
+        Args:
+            endpoint: The route endpoint.
+
+        Returns:
+            "on" or "off" if the maintenance mode is forced on or off for the endpoint, None otherwise.
+        """
+
+        def is_forced(func: Any) -> bool:
+            try:
+                return func in _FORCED_ON_ENDPOINTS or func in _FORCED_OFF_ENDPOINTS
+            except TypeError:
+                # Unhashable callables can't be route decorator wrappers, which are always functions
+                return False
+
+        func = inspect.unwrap(endpoint, stop=is_forced)
+        if not is_forced(func):
+            return None
+        return "on" if func in _FORCED_ON_ENDPOINTS else "off"
+
+    @staticmethod
+    def _build_path_matchers(routes: list[APIRoute]) -> tuple[frozenset[str], Optional[Pattern[str]]]:
+        """Build the matchers for the paths of the given routes.
+
+        Paths without parameters are matched by a set lookup. The patterns of the remaining paths
+        are combined into a single anchored alternation pattern, with named groups turned into
+        non-capturing groups since routes commonly share parameter names.
+
+        Args:
+            routes: The routes to build the path matchers for.
+
+        Returns:
+            A tuple of the set of static paths and a compiled pattern matching any of the parameterized
+            paths (or None if there are no parameterized paths).
+        """
+        static_paths = frozenset(route.path for route in routes if "{" not in route.path)
+        patterns = [route.path_regex.pattern for route in routes if "{" in route.path]
+        if not patterns:
+            return static_paths, None
+        alternatives = "|".join(f"(?:{_NAMED_GROUP_RE.sub('(?:', pattern)})" for pattern in patterns)
+        # Anchor with `\Z` so that `match` behaves like `fullmatch` (`$` also matches before a trailing newline)
+        return static_paths, re.compile(rf"(?:{alternatives})\Z")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            # Other connections (websocket, lifespan) pass through without any maintenance checks
+            if scope["type"] == "lifespan":
+                # Collect the forced paths at application startup instead of on the first request
+                self._update_app_routes(scope)
+            await self.app(scope, receive, send)
+            return
+
+        self._update_app_routes(scope)
+        forward_receive = receive
+        if self._exempt_handler is not None:
+            # The exempt handler may read the request body, which would then be gone for the application
+            body_replay = _RequestBodyReplay(receive)
+            receive, forward_receive = body_replay.receive, body_replay.replay
+
+        if await self._is_maintenance_required(scope, receive):
+            await self._send_maintenance_response(scope, forward_receive, send)
+        else:
+            await self.app(scope, forward_receive, send)
+
+    def _update_app_routes(self, scope: Scope) -> None:
+        """Collect the forced maintenance paths if the application routes have changed since the last collection.
+
+        Args:
+            scope: The ASGI connection scope.
+        """
+        # The application is set in the scope by Starlette, fall back to the wrapped app when wrapping it directly
+        app_routes: list[APIRoute] = getattr(scope.get("app", self.app), "routes", [])
+        if app_routes != self._app_routes:
+            routes = app_routes.copy()
+            self._collect_forced_maintenance_paths(routes)
+            # Only update the routes once the collection succeeded, so that a failed collection is retried
+            self._app_routes = routes
+
+    async def _is_maintenance_required(self, scope: Scope, receive: Receive) -> bool:
+        """Check if the maintenance response should be returned for the request.
+
+        Args:
+            scope: The ASGI connection scope of the incoming request.
+            receive: The ASGI receive callable.
+
+        Returns:
+            True if the request should receive the maintenance response, False if it should proceed.
+        """
+        path: str = scope["path"]
 
         # Built-in exemption: Non-existent paths/methods should return normal HTTP errors, not maintenance
-        if not self._cached_route_exists(request.url.path, request.method):
-            return await call_next(request)
+        if not self._cached_route_exists(path, scope["method"]):
+            return False
 
         # 1. Highest Precedence Block: Path is explicitly forced into maintenance
-        if self._is_path_forced_on(request.url.path):
+        if self._is_path_forced_on(path):
             # Path forced ON implies maintenance regardless of other settings
-            return await self._get_maintenance_response(request)
+            return True
 
         # 2. Highest Precedence Allow: Path is explicitly forced out of maintenance
-        if self._is_path_forced_off(request.url.path):
+        if self._is_path_forced_off(path):
             # Path forced OFF implies proceeding, bypassing other maintenance checks for this path
-            return await call_next(request)
+            return False
 
         # 3. Request-Specific Exemption: The request itself is exempt from maintenance (docs, custom handlers)
-        if await self._is_exempt(request):
+        if await self._is_exempt(scope, receive):
             # Exempt requests proceed unless the path was specifically forced ON (checked above)
-            return await call_next(request)
+            return False
 
         # 4. Maintenance Override Context: Maintenance is globally forced ON via a context manager
         if is_maintenance_override_ctx_active():
             # Override context forces maintenance if not forced_off or request is exempt
-            return await self._get_maintenance_response(request)
+            return True
 
         # 5. General Maintenance Mode: Standard maintenance mode is active based on the backend
-        if await self._is_maintenance_active():
-            # General maintenance is active, and request was not forced_off or exempt
-            return await self._get_maintenance_response(request)
-
-        # Otherwise, continue with the request
-        return await call_next(request)
+        return await self._is_maintenance_active()
 
     def _route_exists(self, path: str, method: str) -> bool:
         """Check if a route exists for the given path and method.
@@ -151,15 +361,58 @@ class MaintenanceModeMiddleware(BaseHTTPMiddleware):
                 return True
         return False
 
-    async def _is_maintenance_active(self) -> bool:
-        """Check if maintenance mode is active.
+    async def _get_static_state(self) -> bool:
+        """Get the maintenance mode state explicitly set by `enable_maintenance`.
 
         Returns:
             True if maintenance mode is active, False otherwise.
         """
-        if self.enable_maintenance is not None:
-            return self.enable_maintenance
-        return await get_maintenance_mode(self.backend)
+        return bool(self.enable_maintenance)
+
+    async def _get_cached_backend_state(self) -> bool:
+        """Get the maintenance mode state from the backend, cached for `cache_ttl` seconds.
+
+        Returns:
+            True if maintenance mode is active, False otherwise.
+        """
+        # Serve the cached state value until it expires
+        if monotonic() < self._cached_state_expires_at:
+            return self._cached_state
+        self._cached_state = await self._read_backend_state()
+        self._cached_state_expires_at = monotonic() + cast(float, self.cache_ttl)
+        return self._cached_state
+
+    async def _read_backend_state(self) -> bool:
+        """Read the maintenance mode state from the backend.
+
+        Concurrent requests share a single pending backend read instead of each reading the state.
+
+        Returns:
+            True if maintenance mode is active according to the backend, False otherwise.
+        """
+        shared_read = self._pending_state_read
+        if shared_read is not None:
+            await shared_read.done.wait()
+            if shared_read.error is not None:
+                raise shared_read.error
+            if shared_read.state is not None:
+                return shared_read.state
+            # The request performing the shared read was cancelled, so read the state for this request instead
+            return await self._read_backend_state()
+
+        shared_read = self._pending_state_read = _SharedStateRead()
+        try:
+            state = await get_maintenance_mode(self.backend)
+        except Exception as exc:
+            shared_read.error = exc
+            raise
+        else:
+            shared_read.state = state
+            return state
+        finally:
+            # Clear the pending read before waking up the waiters, so that they can start a new read if needed
+            self._pending_state_read = None
+            shared_read.done.set()
 
     def _path_matches_patterns(self, path: str, patterns_type: Literal["on", "off"]) -> bool:
         """Check if a path matches forced on or off regex patterns.
@@ -169,15 +422,13 @@ class MaintenanceModeMiddleware(BaseHTTPMiddleware):
             patterns_type: The type of patterns to match against, either "on" or "off".
 
         Returns:
-            True if the path matches any of the specified patterns, False otherwise.
+            True if the path matches the specified patterns, False otherwise.
         """
-        patterns = self._forced_on_paths if patterns_type == "on" else self._forced_off_paths
-        if not patterns:
-            return False
-        for pattern in patterns:
-            if re.fullmatch(pattern, path):
-                return True
-        return False
+        if patterns_type == "on":
+            static_paths, pattern = self._forced_on_static_paths, self._forced_on_paths
+        else:
+            static_paths, pattern = self._forced_off_static_paths, self._forced_off_paths
+        return path in static_paths or (pattern is not None and pattern.match(path) is not None)
 
     def _is_path_forced_on(self, path: str) -> bool:
         """Check if the maintenance mode is forced on for the request's path.
@@ -201,46 +452,62 @@ class MaintenanceModeMiddleware(BaseHTTPMiddleware):
         """
         return self._cached_path_matches_patterns(path, "off")
 
-    async def _is_exempt(self, request: Request) -> bool:
-        """Check if the request is exempt from maintenance mode.
+    async def _is_exempt_by_docs(self, scope: Scope, receive: Receive) -> bool:
+        """Check if the request is exempt from maintenance mode as a documentation request.
 
         Args:
-            request: The incoming request.
+            scope: The ASGI connection scope of the incoming request.
+            receive: The ASGI receive callable.
 
         Returns:
             True if the request is exempt, False otherwise.
         """
         # Built-in exemption: FastAPI documentation endpoints are always exempt
-        if exempt_docs_endpoints(request):
+        return is_docs_endpoint(scope["path"])
+
+    async def _is_exempt_by_docs_or_handler(self, scope: Scope, receive: Receive) -> bool:
+        """Check if the request is exempt from maintenance mode as a documentation request or by the exempt handler.
+
+        Args:
+            scope: The ASGI connection scope of the incoming request.
+            receive: The ASGI receive callable.
+
+        Returns:
+            True if the request is exempt, False otherwise.
+        """
+        if is_docs_endpoint(scope["path"]):
             return True
 
-        # Custom exemption handler
-        if self.exempt_handler is not None:
-            if asyncio.iscoroutinefunction(self.exempt_handler):
-                if await self.exempt_handler(request):
-                    return True
-            else:
-                if self.exempt_handler(request):
-                    return True
-        return False
+        # Custom exemption handler, the request object is only built for the handlers
+        request = Request(scope, receive)
+        return bool(await cast(Callable[[Request], Awaitable[bool]], self._exempt_handler)(request))
 
-    async def _get_maintenance_response(self, request: Request) -> Response:
-        """Get the appropriate maintenance response.
+    async def _send_default_maintenance_response(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Send the prebuilt default maintenance response.
 
         Args:
-            request: The request object.
+            scope: The ASGI connection scope of the incoming request.
+            receive: The ASGI receive callable.
+            send: The ASGI send callable.
+        """
+        # Copy the headers in case other middleware mutates them
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.HTTP_503_SERVICE_UNAVAILABLE,
+                "headers": list(self._default_response_headers),
+            }
+        )
+        await send({"type": "http.response.body", "body": self._default_response_body})
 
-        Returns:
-            The maintenance mode response.
+    async def _send_custom_maintenance_response(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Send the maintenance response returned by the response handler.
+
+        Args:
+            scope: The ASGI connection scope of the incoming request.
+            receive: The ASGI receive callable.
+            send: The ASGI send callable.
         """
-        if self.response_handler is not None:
-            if asyncio.iscoroutinefunction(self.response_handler):
-                return await cast(Callable[[Request], Awaitable[Response]], self.response_handler)(request)
-            else:
-                return cast(Callable[[Request], Response], self.response_handler)(request)
-        else:
-            return JSONResponse(
-                content=DEFAULT_JSON_RESPONSE_CONTENT,
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                headers={"Retry-After": "3600"},
-            )
+        request = Request(scope, receive)
+        response = await cast(Callable[[Request], Awaitable[Response]], self._response_handler)(request)
+        await response(scope, receive, send)
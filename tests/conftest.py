@@ -1,7 +1,51 @@
+import os
+from pathlib import Path as SyncPath
+
 import pytest
 
+from fastapi_maintenance._constants import MAINTENANCE_MODE_ENV_VAR_NAME
+from fastapi_maintenance._context import _set_maintenance_override_ctx_flag
+from fastapi_maintenance._core import reset_backend
+
+ENV_VAR_NAMES = (MAINTENANCE_MODE_ENV_VAR_NAME, "CUSTOM_TEST_VAR", "MY_CUSTOM_MAINTENANCE_ENV_VAR")
+"""Environment variables set by the tests."""
+
 
-@pytest.fixture
+def reset_maintenance_state() -> None:
+    """Reset the backends, the override context flag and the environment variables set by the tests."""
+    reset_backend()
+    _set_maintenance_override_ctx_flag(False)
+    for name in ENV_VAR_NAMES:
+        os.environ.pop(name, None)
+
+
+@pytest.fixture(scope="session")
 def anyio_backend():
     """Configure pytest-anyio to use asyncio backend for async tests."""
     return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def restore_env_vars():
+    """Start the test session from a clean maintenance state and restore the environment variables at the end."""
+    original_values = {name: os.environ.get(name) for name in ENV_VAR_NAMES}
+    reset_maintenance_state()
+    yield
+    for name, value in original_values.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Reset the maintenance state after each test, so that every test starts from a clean state."""
+    yield
+    reset_maintenance_state()
+
+
+@pytest.fixture(scope="session")
+def temp_dir(tmp_path_factory: pytest.TempPathFactory) -> SyncPath:
+    """Return a temporary directory shared by the tests of the session."""
+    return tmp_path_factory.mktemp("maintenance")
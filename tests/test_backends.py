@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path as SyncPath
 
@@ -13,15 +14,6 @@ from fastapi_maintenance.backends import (
 )
 
 
-@pytest.fixture(autouse=True)
-def cleanup_env_vars():
-    """Reset environment variables to their original state after each test."""
-    original_env = os.environ.copy()
-    yield
-    os.environ.clear()
-    os.environ.update(original_env)
-
-
 def test_base_backend_bool_to_str_true():
     """Test conversion of True boolean value to string representation ('1')."""
     assert BaseStateBackend._bool_to_str(True) == "1"
@@ -127,6 +119,26 @@ async def test_env_var_backend_get_value_custom_env_var():
     assert not await backend.get_value()
 
 
+@pytest.mark.anyio
+async def test_env_var_backend_get_value_reflects_env_var_changes(caplog: LogCaptureFixture):
+    """Test that `EnvVarBackend` picks up changes to the environment variable between calls."""
+    backend = EnvVarBackend()
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "1"
+    assert await backend.get_value()
+    assert await backend.get_value()
+
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "0"
+    assert not await backend.get_value()
+
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "invalid_value"
+    with caplog.at_level("WARNING"):
+        assert not await backend.get_value()
+    assert f"Invalid value 'invalid_value' for environment variable {MAINTENANCE_MODE_ENV_VAR_NAME}" in caplog.text
+
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "1"
+    assert await backend.get_value()
+
+
 @pytest.mark.anyio
 async def test_env_var_backend_get_value_invalid_value_logs_warning_and_returns_false(caplog: LogCaptureFixture):
     """Test that `EnvVarBackend` logs a warning and returns False for invalid environment variable values."""
@@ -138,6 +150,58 @@ async def test_env_var_backend_get_value_invalid_value_logs_warning_and_returns_
     assert "Expected boolean-like value. Defaulting to False." in caplog.text
 
 
+@pytest.mark.anyio
+async def test_env_var_backend_get_value_invalid_value_warning_is_rate_limited(
+    caplog: LogCaptureFixture, monkeypatch: pytest.MonkeyPatch
+):
+    """Test that `EnvVarBackend` doesn't repeat the warning for the same invalid value within the interval."""
+    now = 1000.0
+    monkeypatch.setattr("fastapi_maintenance.backends.monotonic", lambda: now)
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "invalid_value"
+    backend = EnvVarBackend()
+
+    def count_warnings() -> int:
+        return sum("Invalid value" in record.getMessage() for record in caplog.records)
+
+    with caplog.at_level("WARNING"):
+        assert not await backend.get_value()
+        assert not await backend.get_value()
+        assert count_warnings() == 1
+
+        # A different invalid value is logged right away
+        os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "other_invalid_value"
+        assert not await backend.get_value()
+        assert count_warnings() == 2
+
+        # The same value is logged again once the interval has passed
+        now += EnvVarBackend._INVALID_VALUE_WARNING_INTERVAL
+        assert not await backend.get_value()
+        assert count_warnings() == 3
+
+
+@pytest.mark.anyio
+async def test_env_var_backend_get_value_invalid_value_is_parsed_once(monkeypatch: pytest.MonkeyPatch):
+    """Test that `EnvVarBackend` only parses an invalid value again once the environment variable changes."""
+    parsed_values = []
+    str_to_bool = EnvVarBackend._str_to_bool
+
+    def counting_str_to_bool(value: str) -> bool:
+        parsed_values.append(value)
+        return str_to_bool(value)
+
+    monkeypatch.setattr(EnvVarBackend, "_str_to_bool", staticmethod(counting_str_to_bool))
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "invalid_value"
+    backend = EnvVarBackend()
+
+    assert not await backend.get_value()
+    assert not await backend.get_value()
+    assert parsed_values == ["invalid_value"]
+
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "1"
+    assert await backend.get_value()
+    assert parsed_values == ["invalid_value", "1"]
+
+
 @pytest.mark.anyio
 async def test_env_var_backend_set_value_logs_warning(caplog: LogCaptureFixture):
     """Test that `EnvVarBackend` logs a warning when attempting to set a value (which is not supported)."""
@@ -175,6 +239,31 @@ async def test_local_file_backend_get_value_file_exists(temp_file_path: str, fil
     assert await backend.get_value() == expected_bool
 
 
+@pytest.mark.anyio
+async def test_local_file_backend_get_value_reads_file_only_when_changed(
+    temp_file_path: str, monkeypatch: pytest.MonkeyPatch
+):
+    """Test that `LocalFileBackend` only reads the file again when its status has changed."""
+    SyncPath(temp_file_path).write_text("1")
+    # Make the file old enough for its status to be cached
+    old_time = SyncPath(temp_file_path).stat().st_mtime - 10
+    os.utime(temp_file_path, (old_time, old_time))
+
+    backend = LocalFileBackend(file_path=temp_file_path)
+    assert await backend.get_value()
+
+    def fail_open_file(*args, **kwargs):
+        raise AssertionError("file should not be read")
+
+    with monkeypatch.context() as m:
+        m.setattr("fastapi_maintenance.backends.open_file", fail_open_file)
+        assert await backend.get_value()
+
+    # Modifying the file from outside the backend is picked up
+    SyncPath(temp_file_path).write_text("0")
+    assert not await backend.get_value()
+
+
 @pytest.mark.anyio
 async def test_local_file_backend_get_value_invalid_content_returns_false(temp_file_path: str):
     """Test that `LocalFileBackend` raises `ValueError` when file contains invalid content."""
@@ -219,6 +308,31 @@ async def test_local_file_backend_set_value_false(temp_file_path: str):
     assert not await backend.get_value()
 
 
+@pytest.mark.anyio
+async def test_local_file_backend_set_value_coalesces_concurrent_writes(
+    temp_file_path: str, monkeypatch: pytest.MonkeyPatch
+):
+    """Test that concurrent `LocalFileBackend.set_value` calls are coalesced and the latest value wins."""
+    from fastapi_maintenance import backends
+
+    writes = []
+    original_open_file = backends.open_file
+
+    async def counting_open_file(file, mode="r", *args, **kwargs):
+        if mode == "w":
+            writes.append(file)
+        return await original_open_file(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr("fastapi_maintenance.backends.open_file", counting_open_file)
+
+    backend = LocalFileBackend(file_path=temp_file_path)
+    await asyncio.gather(*(backend.set_value(value) for value in [True, False, True, False, True]))
+
+    assert 0 < len(writes) < 5
+    assert SyncPath(temp_file_path).read_text() == "1"
+    assert await backend.get_value()
+
+
 @pytest.mark.anyio
 async def test_local_file_backend_requires_file_path():
     """Test that `LocalFileBackend` requires a file_path parameter."""
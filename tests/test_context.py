@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import os
 from pathlib import Path as SyncPath
 
@@ -16,19 +17,12 @@ from fastapi_maintenance._core import configure_backend
 from fastapi_maintenance.backends import LocalFileBackend
 
 
-@pytest.fixture(autouse=True)
-def reset_flag():
-    """Reset the context flag for a clean state between tests."""
-    from fastapi_maintenance._context import _set_maintenance_override_ctx_flag
-
-    _set_maintenance_override_ctx_flag(False)
-    yield
-
-
 @pytest.fixture
-def temp_file_path(tmp_path: SyncPath) -> str:
-    """Return a temporary file path for testing core function with file backend."""
-    return str(tmp_path / "maintenance_core.txt")
+def temp_file_path(temp_dir: SyncPath) -> str:
+    """Return a temporary file path that doesn't exist yet for testing core function with file backend."""
+    file_path = temp_dir / "maintenance_core.txt"
+    file_path.unlink(missing_ok=True)
+    return str(file_path)
 
 
 @pytest.mark.anyio
@@ -75,17 +69,15 @@ async def test_maintenance_mode_on_with_explicit_backend(temp_file_path: str):
     await specific_backend.set_value(False)  # Ensure specific backend is OFF
 
     # Global is ON, specific backend is OFF
-    assert await get_maintenance_mode()
-    assert not await get_maintenance_mode(specific_backend)
+    assert await asyncio.gather(get_maintenance_mode(), get_maintenance_mode(specific_backend)) == [True, False]
 
     # Use context with specific backend
     async with maintenance_mode_on(backend=specific_backend):
-        assert await get_maintenance_mode()  # Global unchanged (still ON)
-        assert await get_maintenance_mode(specific_backend)  # Specific backend is ON
+        # Global unchanged (still ON), specific backend is ON
+        assert await asyncio.gather(get_maintenance_mode(), get_maintenance_mode(specific_backend)) == [True, True]
 
-    # After context: global unchanged, specific backend restored
-    assert await get_maintenance_mode()  # Global unchanged (still ON)
-    assert not await get_maintenance_mode(specific_backend)  # Specific backend restored (OFF)
+    # After context: global unchanged (still ON), specific backend restored (OFF)
+    assert await asyncio.gather(get_maintenance_mode(), get_maintenance_mode(specific_backend)) == [True, False]
 
 
 @pytest.mark.anyio
@@ -114,6 +106,12 @@ async def test_maintenance_mode_on_nested_contexts(temp_file_path: str):
     assert not is_maintenance_override_ctx_active()
 
 
+def count_set_value_warnings(caplog: LogCaptureFixture) -> int:
+    """Count the captured warnings about setting the state via the environment variable backend."""
+    message = f"Cannot set maintenance mode state via environment variable {MAINTENANCE_MODE_ENV_VAR_NAME}"
+    return sum(1 for record in caplog.records if record.levelno == logging.WARNING and message in record.getMessage())
+
+
 @pytest.mark.anyio
 async def test_maintenance_mode_context_manager_with_env_backend_logs_warnings(caplog: LogCaptureFixture):
     """Test that context manager logs warnings when used with `EnvVarBackend` (which is read-only)."""
@@ -126,12 +124,8 @@ async def test_maintenance_mode_context_manager_with_env_backend_logs_warnings(c
         async with maintenance_mode_on():
             # Attempts to set True, then read. Read will be from env var.
             assert not await get_maintenance_mode()  # Stays OFF because env var is "0"
-    assert f"Cannot set maintenance mode state via environment variable {MAINTENANCE_MODE_ENV_VAR_NAME}" in caplog.text
     # Check that it tried to set True and then restore to False (original value)
-    assert (
-        caplog.text.count(f"Cannot set maintenance mode state via environment variable {MAINTENANCE_MODE_ENV_VAR_NAME}")
-        == 2
-    )
+    assert count_set_value_warnings(caplog) == 2
 
     caplog.clear()
     os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "1"  # Start with ON
@@ -139,10 +133,7 @@ async def test_maintenance_mode_context_manager_with_env_backend_logs_warnings(c
     with caplog.at_level("WARNING"):
         async with maintenance_mode_on():
             assert await get_maintenance_mode()  # Stays ON because env var is "1"
-    assert (
-        caplog.text.count(f"Cannot set maintenance mode state via environment variable {MAINTENANCE_MODE_ENV_VAR_NAME}")
-        == 2
-    )
+    assert count_set_value_warnings(caplog) == 2
 
 
 @pytest.mark.anyio
@@ -196,24 +187,22 @@ async def test_maintenance_mode_on_with_dual_backends(temp_file_path: str):
     await main_backend.set_value(False)  # Main backend OFF
     await second_backend.set_value(False)  # Second backend OFF
 
-    # Verify initial states
-    assert not await get_maintenance_mode(main_backend)  # Main backend is OFF
-    assert not await get_maintenance_mode(second_backend)  # Second backend is OFF
+    async def get_states():
+        return await asyncio.gather(get_maintenance_mode(main_backend), get_maintenance_mode(second_backend))
+
+    # Verify initial states: both backends are OFF
+    assert await get_states() == [False, False]
 
     async with maintenance_mode_on(backend=second_backend):
-        assert not await get_maintenance_mode(main_backend)  # Main backend still OFF
-        assert await get_maintenance_mode(second_backend)  # Second backend now ON
+        # Main backend still OFF, second backend now ON
+        assert await get_states() == [False, True]
 
-        # Change main backend inside context
+        # Change main backend inside context, the second backend is left untouched (ON via context)
         await main_backend.set_value(True)  # Set main backend ON
-
-        # Both should now be ON but for different reasons
         assert await get_maintenance_mode(main_backend)  # Main backend manually set ON
-        assert await get_maintenance_mode(second_backend)  # Second backend ON via context
 
     # After context: main should still be ON, second back to OFF
-    assert await get_maintenance_mode(main_backend)  # Main backend remains ON
-    assert not await get_maintenance_mode(second_backend)  # Second backend restored to OFF
+    assert await get_states() == [True, False]
 
 
 @pytest.mark.anyio
@@ -10,6 +10,8 @@ from fastapi_maintenance._constants import (
     FORCE_MAINTENANCE_MODE_ON_ATTR,
 )
 from fastapi_maintenance.decorators import (
+    _FORCED_OFF_ENDPOINTS,
+    _FORCED_ON_ENDPOINTS,
     force_maintenance_mode_off,
     force_maintenance_mode_on,
 )
@@ -67,6 +69,23 @@ async def test_force_maintenance_mode_on_async():
     assert await async_endpoint() == "async_should_not_be_called"  # Decorator doesn't prevent call, middleware does
 
 
+def test_decorators_register_decorated_functions():
+    """Test that the decorators register the decorated functions for the middleware to look up."""
+
+    @force_maintenance_mode_off
+    def forced_off_endpoint():
+        return "ok"
+
+    @force_maintenance_mode_on
+    async def forced_on_endpoint():
+        return "ok"
+
+    assert forced_off_endpoint in _FORCED_OFF_ENDPOINTS
+    assert forced_off_endpoint not in _FORCED_ON_ENDPOINTS
+    assert forced_on_endpoint in _FORCED_ON_ENDPOINTS
+    assert forced_on_endpoint not in _FORCED_OFF_ENDPOINTS
+
+
 @pytest.mark.anyio
 async def test_decorators_integration_with_middleware():
     """Test that decorators correctly integrate with the `MaintenanceModeMiddleware` to control route availability."""
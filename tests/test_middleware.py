@@ -1,10 +1,16 @@
 import asyncio
 import os
+from dataclasses import dataclass
+from functools import wraps
+from importlib.util import find_spec
 from pathlib import Path as SyncPath
+from typing import Optional
 
+import anyio
 import pytest
-from fastapi import FastAPI, Request, Response, status
+from fastapi import FastAPI, Request, Response, WebSocket, status
 from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
 
 from fastapi_maintenance import (
@@ -15,45 +21,35 @@ from fastapi_maintenance import (
     set_maintenance_mode,
 )
 from fastapi_maintenance._constants import DEFAULT_JSON_RESPONSE_CONTENT
-from fastapi_maintenance._core import _backend as core_backend  # For reset
 from fastapi_maintenance._core import configure_backend
-from fastapi_maintenance.backends import MAINTENANCE_MODE_ENV_VAR_NAME, LocalFileBackend
+from fastapi_maintenance.backends import MAINTENANCE_MODE_ENV_VAR_NAME, BaseStateBackend, LocalFileBackend
 
 CUSTOM_HTML_CONTENT = "<html><body><h1>Custom Maintenance</h1></body></html>"
 CUSTOM_JSON_CONTENT = {"error": "custom_maintenance", "message": "We are down for a bit!"}
 
-
-@pytest.fixture(autouse=True)
-def reset_core_and_env_state():
-    """Reset the core backend and environment variables to a clean state between tests."""
-    original_backend = core_backend
-    original_env = os.environ.copy()
-    # Reset to default EnvVarBackend
-    configure_backend("env")
-    if MAINTENANCE_MODE_ENV_VAR_NAME in os.environ:
-        del os.environ[MAINTENANCE_MODE_ENV_VAR_NAME]
-    yield
-    # Restore
-    globals()["core_backend"] = original_backend
-    # A more robust way to reset core_backend would be preferred if available
-    # For now, explicitly reconfigure to ensure clean state for next test
-    configure_backend("env")
-    os.environ.clear()
-    os.environ.update(original_env)
-    if MAINTENANCE_MODE_ENV_VAR_NAME in os.environ:
-        del os.environ[MAINTENANCE_MODE_ENV_VAR_NAME]
+# trio is not a dev dependency, so its cases only run where it is installed
+ANYIO_BACKENDS = [
+    "asyncio",
+    pytest.param("trio", marks=pytest.mark.skipif(find_spec("trio") is None, reason="trio is not installed")),
+]
 
 
 @pytest.fixture
-def temp_file_path(tmp_path: SyncPath) -> str:
-    """Return a temporary file path for testing middleware with file backend."""
-    return str(tmp_path / "maintenance_middleware.txt")
+def temp_file_path(temp_dir: SyncPath) -> str:
+    """Reset the shared temporary file to maintenance mode off and return its path for file backend tests."""
+    file_path = temp_dir / "maintenance_middleware.txt"
+    file_path.write_text("0")
+    return str(file_path)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def app_with_middleware() -> FastAPI:
-    """Create a FastAPI app with example routes for testing the middleware."""
-    app = FastAPI()
+    """Create a FastAPI app with example routes for testing the middleware.
+
+    The app is shared by the tests of the module, so tests wrap it with their own middleware
+    instead of adding the middleware to the app. The documentation endpoints are not needed by these tests.
+    """
+    app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
 
     @app.get("/regular")
     async def regular_endpoint():
@@ -69,24 +65,32 @@ def app_with_middleware() -> FastAPI:
     async def forced_on_by_decorator_endpoint():
         return {"message": "Should not be called"}
 
+    @app.get("/complex_force_on")
+    @force_maintenance_mode_on  # Then force on (top-most decorator wins)
+    @force_maintenance_mode_off  # Attempt to force off
+    async def complex_force_on_endpoint():
+        return {"message": "Complex force on - should not be seen"}
+
     return app
 
 
 @pytest.mark.anyio
 async def test_middleware_maintenance_mode_on_init(app_with_middleware: FastAPI):
     """Test that middleware initialized with `enable_maintenance=True` blocks regular routes."""
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    middleware = MaintenanceModeMiddleware(app_with_middleware, enable_maintenance=True)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["retry-after"] == "3600"
         assert response.json() == DEFAULT_JSON_RESPONSE_CONTENT
 
 
 @pytest.mark.anyio
 async def test_middleware_maintenance_mode_off_init(app_with_middleware: FastAPI):
     """Test that middleware initialized with `enable_maintenance=False` allows regular routes."""
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware, enable_maintenance=False)
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    middleware = MaintenanceModeMiddleware(app_with_middleware, enable_maintenance=False)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_200_OK
         assert response.json() == {"message": "Hello World"}
@@ -96,8 +100,8 @@ async def test_middleware_maintenance_mode_off_init(app_with_middleware: FastAPI
 async def test_middleware_env_var_backend_on(app_with_middleware: FastAPI):
     """Test that middleware with default `EnvVarBackend` respects environment variable (ON state)."""
     os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "1"
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware)  # Uses default EnvVarBackend
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    middleware = MaintenanceModeMiddleware(app_with_middleware)  # Uses default EnvVarBackend
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
@@ -106,8 +110,8 @@ async def test_middleware_env_var_backend_on(app_with_middleware: FastAPI):
 async def test_middleware_env_var_backend_off(app_with_middleware: FastAPI):
     """Test that middleware with default `EnvVarBackend` respects environment variable (OFF state)."""
     os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "0"
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware)
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    middleware = MaintenanceModeMiddleware(app_with_middleware)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_200_OK
 
@@ -119,25 +123,149 @@ async def test_middleware_local_file_backend_on(app_with_middleware: FastAPI, te
     # or pass it directly to middleware, here we test passing it to middleware.
     file_backend = LocalFileBackend(file_path=temp_file_path)
     await file_backend.set_value(True)
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware, backend=file_backend)
+    middleware = MaintenanceModeMiddleware(app_with_middleware, backend=file_backend)
+
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        response = await client.get("/regular")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+        # Test changing the value dynamically
+        await file_backend.set_value(False)
+        response = await client.get("/regular")
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.anyio
+async def test_middleware_cache_ttl_caches_backend_state(
+    app_with_middleware: FastAPI, temp_file_path: str, monkeypatch: pytest.MonkeyPatch
+):
+    """Test that middleware with `cache_ttl` serves the cached state until it expires."""
+    now = 1000.0
+    monkeypatch.setattr("fastapi_maintenance.middleware.monotonic", lambda: now)
+
+    file_backend = LocalFileBackend(file_path=temp_file_path)
+    await file_backend.set_value(True)
+    middleware = MaintenanceModeMiddleware(app_with_middleware, backend=file_backend, cache_ttl=5)
 
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
-    # Test changing the value dynamically
-    await file_backend.set_value(False)
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+        # State changes are not picked up while the cached value is fresh
+        await file_backend.set_value(False)
+        now += 4
+        response = await client.get("/regular")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+        # State is read from the backend again once the cached value expires
+        now += 1
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_200_OK
 
 
+class CountingBackend(BaseStateBackend):
+    """Backend counting its state reads, which only complete once `release` is set."""
+
+    def __init__(self, error: Optional[Exception] = None) -> None:
+        self.reads = 0
+        self.error = error
+        self.read_started = anyio.Event()
+        self.release = anyio.Event()
+
+    async def get_value(self) -> bool:
+        self.reads += 1
+        self.read_started.set()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return True
+
+    async def set_value(self, value: bool) -> None:
+        pass
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("anyio_backend", ANYIO_BACKENDS)
+async def test_middleware_request_on_any_anyio_backend(app_with_middleware: FastAPI, anyio_backend: str):
+    """Test that the middleware reads the backend state when running on any anyio backend."""
+    os.environ[MAINTENANCE_MODE_ENV_VAR_NAME] = "1"
+    middleware = MaintenanceModeMiddleware(app_with_middleware)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        response = await client.get("/regular")
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("anyio_backend", ANYIO_BACKENDS)
+async def test_middleware_coalesces_concurrent_backend_reads(app_with_middleware: FastAPI, anyio_backend: str):
+    """Test that concurrent requests share a single pending backend read."""
+    backend = CountingBackend()
+    middleware = MaintenanceModeMiddleware(app_with_middleware, backend=backend)
+    results = []
+
+    async def check_maintenance() -> None:
+        results.append(await middleware._is_maintenance_active())
+
+    async with anyio.create_task_group() as task_group:
+        for _ in range(5):
+            task_group.start_soon(check_maintenance)
+        await backend.read_started.wait()
+        await anyio.wait_all_tasks_blocked()
+        backend.release.set()
+
+    assert results == [True] * 5
+    assert backend.reads == 1
+
+    # Once the pending read is done, the next request reads the state from the backend again
+    assert await middleware._is_maintenance_active()
+    assert backend.reads == 2
+
+
+@pytest.mark.anyio
+async def test_middleware_shared_backend_read_error_is_raised_for_all_requests(app_with_middleware: FastAPI):
+    """Test that an error of the shared backend read is raised for every request waiting on it."""
+    backend = CountingBackend(error=RuntimeError("backend unavailable"))
+    middleware = MaintenanceModeMiddleware(app_with_middleware, backend=backend)
+
+    first = asyncio.create_task(middleware._is_maintenance_active())
+    await backend.read_started.wait()
+    second = asyncio.create_task(middleware._is_maintenance_active())
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    results = await asyncio.gather(first, second, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert backend.reads == 1
+
+
+@pytest.mark.anyio
+async def test_middleware_shared_backend_read_cancellation_does_not_cancel_waiting_requests(
+    app_with_middleware: FastAPI,
+):
+    """Test that requests waiting on a shared backend read read the state themselves if that read is cancelled."""
+    backend = CountingBackend()
+    middleware = MaintenanceModeMiddleware(app_with_middleware, backend=backend)
+
+    first = asyncio.create_task(middleware._is_maintenance_active())
+    await backend.read_started.wait()
+    second = asyncio.create_task(middleware._is_maintenance_active())
+    await asyncio.sleep(0)
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    backend.release.set()
+
+    assert await second
+    assert backend.reads == 2
+
+
 @pytest.mark.anyio
 async def test_middleware_decorator_exemptions(app_with_middleware: FastAPI):
     """Test that decorators correctly override maintenance mode behavior for specific routes."""
     # Middleware is ON by init param
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    middleware = MaintenanceModeMiddleware(app_with_middleware, enable_maintenance=True)
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Regular endpoint should be in maintenance
         response_regular = await client.get("/regular")
         assert response_regular.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -153,35 +281,34 @@ async def test_middleware_decorator_exemptions(app_with_middleware: FastAPI):
 
 
 @pytest.mark.anyio
-@pytest.mark.parametrize("is_async_handler", [False, True])
-async def test_middleware_exempt_handler(app_with_middleware: FastAPI, is_async_handler: bool):
+async def test_middleware_exempt_handler(app_with_middleware: FastAPI):
     """Test exempt_handler with both synchronous and asynchronous handler functions."""
 
     def sync_exempt_handler(request: Request) -> bool:
         return request.url.path == "/regular"  # Exempt only /regular
 
     async def async_exempt_handler(request: Request) -> bool:
-        await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
         return request.url.path == "/regular"
 
-    handler = async_exempt_handler if is_async_handler else sync_exempt_handler
-    app_with_middleware.add_middleware(
-        MaintenanceModeMiddleware,
-        enable_maintenance=True,  # Maintenance is ON
-        exempt_handler=handler,
-    )
+    for handler in [sync_exempt_handler, async_exempt_handler]:
+        middleware = MaintenanceModeMiddleware(
+            app_with_middleware,
+            enable_maintenance=True,  # Maintenance is ON
+            exempt_handler=handler,
+        )
 
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
-        # /regular is exempt by handler, should work
-        response_regular = await client.get("/regular")
-        assert response_regular.status_code == status.HTTP_200_OK
-        assert response_regular.json() == {"message": "Hello World"}
+        async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+            # /regular is exempt by handler, should work
+            response_regular = await client.get("/regular")
+            assert response_regular.status_code == status.HTTP_200_OK
+            assert response_regular.json() == {"message": "Hello World"}
 
-        # /exempt_by_decorator is NOT exempt by this handler, but IS by its own decorator
-        # Decorator @force_maintenance_mode_off should take precedence over general maintenance mode
-        response_exempt_deco = await client.get("/exempt_by_decorator")
-        assert response_exempt_deco.status_code == status.HTTP_200_OK
-        assert response_exempt_deco.json() == {"message": "Always works"}
+            # /exempt_by_decorator is NOT exempt by this handler, but IS by its own decorator
+            # Decorator @force_maintenance_mode_off should take precedence over general maintenance mode
+            response_exempt_deco = await client.get("/exempt_by_decorator")
+            assert response_exempt_deco.status_code == status.HTTP_200_OK
+            assert response_exempt_deco.json() == {"message": "Always works"}
 
 
 @pytest.mark.anyio
@@ -191,60 +318,84 @@ async def test_middleware_exempt_handler_path_not_exempt(app_with_middleware: Fa
     def exempt_nothing_handler(request: Request) -> bool:
         return False  # Nothing is exempt
 
-    app_with_middleware.add_middleware(
-        MaintenanceModeMiddleware, enable_maintenance=True, exempt_handler=exempt_nothing_handler
+    middleware = MaintenanceModeMiddleware(
+        app_with_middleware, enable_maintenance=True, exempt_handler=exempt_nothing_handler
     )
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
 
 @pytest.mark.anyio
-@pytest.mark.parametrize(
-    "is_async_handler, response_type", [(False, "html"), (True, "html"), (False, "json"), (True, "json")]
-)
-async def test_middleware_custom_response_handler(
-    app_with_middleware: FastAPI, is_async_handler: bool, response_type: str
-):
+async def test_middleware_handlers_reading_request_body():
+    """Test that the request body read by the exempt handler is still available to the route and response handler."""
+    app = FastAPI()
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return await request.json()
+
+    async def exempt_admin_handler(request: Request) -> bool:
+        return (await request.json()).get("admin", False)
+
+    async def echo_response_handler(request: Request) -> Response:
+        return JSONResponse(content=await request.json(), status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    middleware = MaintenanceModeMiddleware(
+        app,
+        enable_maintenance=True,
+        exempt_handler=exempt_admin_handler,
+        response_handler=echo_response_handler,
+    )
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        with anyio.fail_after(5):
+            response = await client.post("/echo", json={"admin": True})
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == {"admin": True}
+
+            response = await client.post("/echo", json={"admin": False})
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert response.json() == {"admin": False}
+
+
+@pytest.mark.anyio
+async def test_middleware_custom_response_handler(app_with_middleware: FastAPI):
     """Test custom response handlers (sync/async) returning different response types (HTML/JSON)."""
 
     def sync_html_response(request: Request) -> Response:
         return HTMLResponse(content=CUSTOM_HTML_CONTENT, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     async def async_html_response(request: Request) -> Response:
-        await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
         return HTMLResponse(content=CUSTOM_HTML_CONTENT, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     def sync_json_response(request: Request) -> Response:
         return JSONResponse(content=CUSTOM_JSON_CONTENT, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
     async def async_json_response(request: Request) -> Response:
-        await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
         return JSONResponse(content=CUSTOM_JSON_CONTENT, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-    if response_type == "html":
-        handler = async_html_response if is_async_handler else sync_html_response
-        expected_content = CUSTOM_HTML_CONTENT
-        expected_media_type = "text/html"
-    else:  # json
-        handler = async_json_response if is_async_handler else sync_json_response
-        expected_content = CUSTOM_JSON_CONTENT
-        expected_media_type = "application/json"
-
-    app_with_middleware.add_middleware(
-        MaintenanceModeMiddleware,
-        enable_maintenance=True,  # Maintenance is ON
-        response_handler=handler,
-    )
-
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
-        response = await client.get("/regular")
-        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
-        assert response.headers["content-type"].startswith(expected_media_type)
-        if response_type == "html":
-            assert response.text == expected_content
-        else:
-            assert response.json() == expected_content
+    for handler, expected_media_type in [
+        (sync_html_response, "text/html"),
+        (async_html_response, "text/html"),
+        (sync_json_response, "application/json"),
+        (async_json_response, "application/json"),
+    ]:
+        middleware = MaintenanceModeMiddleware(
+            app_with_middleware,
+            enable_maintenance=True,  # Maintenance is ON
+            response_handler=handler,
+        )
+
+        async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+            response = await client.get("/regular")
+            assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+            assert response.headers["content-type"].startswith(expected_media_type)
+            if expected_media_type == "text/html":
+                assert response.text == CUSTOM_HTML_CONTENT
+            else:
+                assert response.json() == CUSTOM_JSON_CONTENT
 
 
 @pytest.mark.anyio
@@ -255,9 +406,9 @@ async def test_middleware_reacts_to_core_set_maintenance_mode(app_with_middlewar
     await set_maintenance_mode(False)  # Start with OFF
 
     # Middleware uses the default configured backend
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware)
+    middleware = MaintenanceModeMiddleware(app_with_middleware)
 
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         response = await client.get("/regular")
         assert response.status_code == status.HTTP_200_OK
 
@@ -273,7 +424,7 @@ async def test_middleware_reacts_to_core_set_maintenance_mode(app_with_middlewar
 
 
 @pytest.mark.anyio
-async def test_middleware_path_regex_collection_on_init(tmp_path: SyncPath):
+async def test_middleware_path_regex_collection_on_init(temp_file_path: str):
     """Test that decorated paths are correctly recognized by the middleware."""
     # This test verifies that decorated paths are correctly handled by the middleware
     # We'll check this through behavior instead of internal state
@@ -299,44 +450,208 @@ async def test_middleware_path_regex_collection_on_init(tmp_path: SyncPath):
         return {"status": "off_path_param", "item_id": item_id}
 
     # Add the middleware properly
-    file_path = str(tmp_path / "maintenance.txt")
-    configure_backend("file", file_path=file_path)
+    configure_backend("file", file_path=temp_file_path)
     await set_maintenance_mode(True)
-    app.add_middleware(MaintenanceModeMiddleware)
+    middleware = MaintenanceModeMiddleware(app)
+
+    # Test the behavior of the middleware on different paths through concurrent HTTP requests
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        response_p1, response_p2, response_p3, response_p4, response_p4_wrong = await asyncio.gather(
+            client.get("/p1/off"),
+            client.get("/p2/on"),
+            client.get("/p3/regular"),
+            client.get("/p4/test_id/off"),
+            client.get("/p4/off"),
+        )
 
-    # Test the behavior of the middleware on different paths through HTTP requests
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         # This path has force_maintenance_mode_off - should be accessible
-        response_p1 = await client.get("/p1/off")
         assert response_p1.status_code == status.HTTP_200_OK
         assert response_p1.json() == {"status": "off_path"}
 
         # This path has force_maintenance_mode_on - should be in maintenance
-        response_p2 = await client.get("/p2/on")
         assert response_p2.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
         # Regular path with no decorator - should be in maintenance (because enable_maintenance=True)
-        response_p3 = await client.get("/p3/regular")
         assert response_p3.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
 
         # Path with param and force_maintenance_mode_off - should be accessible
-        response_p4 = await client.get("/p4/test_id/off")
         assert response_p4.status_code == status.HTTP_200_OK
         assert response_p4.json() == {"status": "off_path_param", "item_id": "test_id"}
 
         # Path similar to p4 but incorrect structure - should return 404 not found error
-        response_p4_wrong = await client.get("/p4/off")
         assert response_p4_wrong.status_code == status.HTTP_404_NOT_FOUND
 
-    # Test with maintenance off first to cover the endpoint without decorator
-    await set_maintenance_mode(False)
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        # Test with maintenance off to cover the endpoint without decorator
+        await set_maintenance_mode(False)
         # This path has no decorator - should be accessible
         response_p3_off = await client.get("/p3/regular")
         assert response_p3_off.status_code == status.HTTP_200_OK
         assert response_p3_off.json() == {"status": "regular_path"}
 
 
+@pytest.mark.anyio
+async def test_middleware_collects_forced_paths_on_lifespan_startup():
+    """Test that the middleware collects the forced paths when the application starts up."""
+    app = FastAPI()
+
+    @app.get("/forced_on")
+    @force_maintenance_mode_on
+    async def forced_on():
+        return {"status": "on_path"}
+
+    @app.get("/forced_off/{item_id}")
+    @force_maintenance_mode_off
+    async def forced_off(item_id: str):
+        return {"status": "off_path"}
+
+    middleware = MaintenanceModeMiddleware(app)
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent_messages = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent_messages.append(message)
+
+    await middleware({"type": "lifespan", "state": {}}, receive, send)
+
+    assert [message["type"] for message in sent_messages] == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+    assert middleware._is_path_forced_on("/forced_on")
+    assert middleware._is_path_forced_off("/forced_off/1")
+    assert not middleware._is_path_forced_off("/forced_on")
+
+
+@pytest.mark.anyio
+async def test_middleware_retries_failed_forced_paths_collection():
+    """Test that the forced paths are collected again on the next request if their collection failed."""
+    app = FastAPI()
+
+    @app.get("/forced_off")
+    @force_maintenance_mode_off
+    async def forced_off():
+        return {"status": "off_path"}
+
+    # Mounted applications have no endpoint, which makes the collection fail
+    app.mount("/sub", FastAPI())
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
+
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        for _ in range(2):
+            with pytest.raises(AttributeError):
+                await client.get("/forced_off")
+
+        app.router.routes.pop()
+        response = await client.get("/forced_off")
+        assert response.status_code == status.HTTP_200_OK
+
+
+def test_middleware_passes_through_websocket_connections():
+    """Test that websocket connections are not affected by maintenance mode."""
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.send_text("connected")
+        await websocket.close()
+
+    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            assert websocket.receive_text() == "connected"
+
+
+@pytest.mark.anyio
+async def test_middleware_forced_paths_under_other_decorators():
+    """Test that route decorators are recognized when applied under decorators that don't copy attributes."""
+    app = FastAPI()
+
+    def passthrough(func):
+        @wraps(func, updated=())
+        async def wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    @app.get("/wrapped/off")
+    @passthrough
+    @force_maintenance_mode_off
+    async def wrapped_off():
+        return {"status": "off_path"}
+
+    @app.get("/wrapped/on")
+    @passthrough
+    @force_maintenance_mode_on
+    async def wrapped_on():
+        return {"status": "on_path"}
+
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=False)
+
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        response_off = await client.get("/wrapped/off")
+        assert response_off.status_code == status.HTTP_200_OK
+        assert response_off.json() == {"status": "off_path"}
+
+        response_on = await client.get("/wrapped/on")
+        assert response_on.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.mark.anyio
+async def test_middleware_with_unhashable_callable_endpoint():
+    """Test that unhashable callable endpoints are handled as endpoints without route decorators."""
+
+    @dataclass
+    class Handler:
+        message: str
+
+        async def __call__(self):
+            return {"message": self.message}
+
+    app = FastAPI()
+    app.add_api_route("/handler", Handler("hi"))
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=False)
+
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        response = await client.get("/handler")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {"message": "hi"}
+
+
+@pytest.mark.anyio
+async def test_middleware_forced_paths_with_shared_path_params():
+    """Test that multiple forced routes sharing path parameter names are all recognized by the middleware."""
+    app = FastAPI()
+
+    @app.get("/users/{item_id}")
+    @force_maintenance_mode_off
+    async def get_user(item_id: str):
+        return {"user_id": item_id}
+
+    @app.get("/orders/{item_id}")
+    @force_maintenance_mode_off
+    async def get_order(item_id: str):
+        return {"order_id": item_id}
+
+    @app.get("/orders/{item_id}/items")
+    async def get_order_items(item_id: str):
+        return {"items": []}
+
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
+
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
+        # Both forced off routes should be accessible
+        assert (await client.get("/users/1")).status_code == status.HTTP_200_OK
+        assert (await client.get("/orders/1")).status_code == status.HTTP_200_OK
+
+        # A longer path starting with a forced off path should not match it
+        assert (await client.get("/orders/1/items")).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
 @pytest.mark.anyio
 async def test_middleware_force_on_takes_precedence_over_exempt_handler_and_force_off_decorator(
     app_with_middleware: FastAPI,
@@ -347,26 +662,19 @@ async def test_middleware_force_on_takes_precedence_over_exempt_handler_and_forc
     # And an exempt_handler would exempt it.
     # The `force_maintenance_mode_on` on the route itself should be the ultimate decider for that route.
 
-    # Let's redefine an endpoint for this specific scenario:
-    @app_with_middleware.get("/complex_force_on")
-    @force_maintenance_mode_on  # Then force on (top-most decorator wins in attribute setting)
-    @force_maintenance_mode_off  # Attempt to force off
-    async def complex_force_on_endpoint():
-        return {"message": "Complex force on - should not be seen"}
-
+    # The /complex_force_on endpoint of the app is decorated with both decorators for this scenario
     def always_exempt_handler(request: Request) -> bool:
         return True  # Exempts everything if it were to be checked
 
-    # Middleware uses the app instance which now has the new route
     # Initialize middleware with general maintenance OFF, but path is forced ON
-    app_with_middleware.add_middleware(
-        MaintenanceModeMiddleware,
+    middleware = MaintenanceModeMiddleware(
+        app_with_middleware,
         enable_maintenance=False,  # General maintenance is OFF
         exempt_handler=always_exempt_handler,
     )
 
     async with AsyncClient(
-        transport=ASGITransport(app=app_with_middleware), base_url="http://test"
+        transport=ASGITransport(app=middleware), base_url="http://test"
     ) as client:  # Test with the middleware as ASGI app
         response_complex = await client.get("/complex_force_on")
         assert response_complex.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -390,9 +698,9 @@ async def test_context_on_vs_decorator_force_off(app_with_middleware: FastAPI, t
 
     # Add middleware. It will use the globally configured backend (file backend)
     # as enable_maintenance is not set and no specific backend is passed to it.
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware)
+    middleware = MaintenanceModeMiddleware(app_with_middleware)
 
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Initial check: /exempt_by_decorator (forced_off) is OK, /regular is OK
         assert (await client.get("/exempt_by_decorator")).status_code == status.HTTP_200_OK
         assert (await client.get("/regular")).status_code == status.HTTP_200_OK
@@ -435,13 +743,13 @@ async def test_context_on_vs_exempt_handler(temp_file_path: str):
     def custom_exempt_handler(request: Request) -> bool:
         return request.url.path == "/exempted_by_handler_rule"
 
-    app.add_middleware(
-        MaintenanceModeMiddleware,
+    middleware = MaintenanceModeMiddleware(
+        app,
         exempt_handler=custom_exempt_handler,
         # Middleware will use configured file backend for its general state
     )
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Initial check: both routes OK
         assert (await client.get("/exempted_by_handler_rule")).status_code == status.HTTP_200_OK
         assert (await client.get("/normal_for_handler_context_test")).status_code == status.HTTP_200_OK
@@ -462,7 +770,7 @@ async def test_context_on_vs_exempt_handler(temp_file_path: str):
 
 @pytest.mark.anyio
 async def test_context_on_uses_middleware_backend_implicitly(
-    app_with_middleware: FastAPI, temp_file_path: str, tmp_path: SyncPath
+    app_with_middleware: FastAPI, temp_file_path: str, temp_dir: SyncPath
 ):
     """
     Test that `maintenance_mode_on()` (with no args) uses the middleware-registered backend.
@@ -473,16 +781,16 @@ async def test_context_on_uses_middleware_backend_implicitly(
 
     # A different backend, configured as the global fallback.
     # maintenance_mode_on() should NOT use this if middleware has its own.
-    other_file_path = str(tmp_path / "other_maintenance_file.txt")
+    other_file_path = str(temp_dir / "other_maintenance_file.txt")
     other_backend = LocalFileBackend(file_path=other_file_path)
     await other_backend.set_value(False)  # Other backend state: OFF
     configure_backend("file", file_path=other_file_path)  # Set as global fallback
 
     # Add middleware, providing it with its own specific backend.
     # This action registers 'middleware_backend' via register_middleware_backend().
-    app_with_middleware.add_middleware(MaintenanceModeMiddleware, backend=middleware_backend)
+    middleware = MaintenanceModeMiddleware(app_with_middleware, backend=middleware_backend)
 
-    async with AsyncClient(transport=ASGITransport(app=app_with_middleware), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Initial state: all backends OFF, /regular is OK
         assert not await middleware_backend.get_value()
         assert not await other_backend.get_value()
@@ -514,6 +822,7 @@ async def test_docs_endpoints_automatically_exempted():
         return {"users": ["user1", "user2"]}
 
     # Add middleware - docs should be exempt by default
+    # Most tests wrap the app with the middleware directly, this one covers adding it through `add_middleware`
     app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
 
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
@@ -557,9 +866,9 @@ async def test_custom_exempt_handler_works_with_built_in_exemptions():
         return request.url.path == "/health"
 
     # Use custom exemption handler alongside built-in docs exemption
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True, exempt_handler=custom_exempt_handler)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True, exempt_handler=custom_exempt_handler)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Regular API endpoint should be blocked
         response = await client.get("/api/users")
         assert response.status_code == 503
@@ -591,12 +900,12 @@ async def test_async_exempt_handler_works_with_built_in_exemptions():
     async def async_exempt_handler(request: Request) -> bool:
         """Async handler that exempts admin endpoints."""
         # Simulate async operation
-        await asyncio.sleep(0.001)
+        await asyncio.sleep(0)
         return request.url.path.startswith("/admin/")
 
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True, exempt_handler=async_exempt_handler)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True, exempt_handler=async_exempt_handler)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Regular API endpoint should be blocked
         response = await client.get("/api/users")
         assert response.status_code == 503
@@ -626,9 +935,9 @@ async def test_no_custom_exempt_handler_only_docs_exempted():
         return {"users": ["user1", "user2"]}
 
     # No custom exempt handler - only built-in docs exemption
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Regular endpoints should be blocked
         response = await client.get("/api/users")
         assert response.status_code == 503
@@ -664,9 +973,9 @@ async def test_http_errors_exempt_from_maintenance():
         return {"status": "healthy"}
 
     # Add middleware with maintenance enabled
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing endpoints should return maintenance response
         response = await client.get("/api/users")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -730,9 +1039,9 @@ async def test_method_not_allowed_exempt_from_maintenance():
         return {"item_id": item_id, "updated": True}
 
     # Add middleware with maintenance enabled
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing endpoints should return maintenance response
         response = await client.get("/api/resource")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -781,9 +1090,9 @@ async def test_http_errors_with_path_parameters():
         return {"user_id": user_id, "post_id": post_id}
 
     # Add middleware with maintenance enabled
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing parameterized endpoints should return maintenance response
         response = await client.get("/api/users/123")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -834,9 +1143,9 @@ async def test_http_errors_with_custom_exempt_handler():
         return request.url.path == "/health"
 
     # Add middleware with maintenance enabled and custom exempt handler
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True, exempt_handler=custom_exempt_handler)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True, exempt_handler=custom_exempt_handler)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing endpoint not exempted by custom handler should return maintenance
         response = await client.get("/api/users")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -893,9 +1202,9 @@ async def test_http_errors_with_forced_decorators():
         return {"message": "Should not be seen"}
 
     # Add middleware with maintenance disabled (but forced decorators should override)
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=False)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=False)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Regular endpoints should work (maintenance disabled)
         response = await client.get("/api/users")
         assert response.status_code == status.HTTP_200_OK
@@ -944,9 +1253,9 @@ async def test_http_error_behavior_consistency():
         return {"message": "User created"}
 
     # Test with maintenance OFF first
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=False)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=False)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing endpoints should work
         response = await client.get("/api/users")
         assert response.status_code == status.HTTP_200_OK
@@ -973,9 +1282,9 @@ async def test_http_error_behavior_consistency():
     async def create_users_maintenance_on():
         return {"message": "User created"}
 
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing endpoints should return maintenance
         response = await client.get("/api/users")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -1011,9 +1320,9 @@ async def test_docs_endpoints_still_exempted_with_http_error_logic():
         return {"message": "User created"}
 
     # Add middleware with maintenance enabled
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Regular endpoints should return maintenance
         response = await client.get("/api/users")
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -1065,9 +1374,9 @@ async def test_http_errors_take_precedence_over_forced_decorators():
         return {"message": "This endpoint is forced OFF"}
 
     # Add middleware with general maintenance enabled
-    app.add_middleware(MaintenanceModeMiddleware, enable_maintenance=True)
+    middleware = MaintenanceModeMiddleware(app, enable_maintenance=True)
 
-    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=middleware), base_url="http://test") as client:
         # Existing endpoints behave according to their decorators
         response = await client.get("/api/forced-on")  # Forced ON
         assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE